@@ -7,6 +7,7 @@ import queue
 import signal
 import os
 import soundfile as sf
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from dotenv import load_dotenv
 from PySide6.QtWidgets import QApplication
@@ -19,14 +20,19 @@ from services.asr_service import ASRService
 from services.timer_overlay import ControlWidget
 from services.vision_service import VisionService
 from services.content_enhancement_service import ContentEnhancementService
-from utils.screenshot_util import take_screenshot, resize_image, save_screenshot
+from utils.screenshot_util import take_screenshot, resize_image, save_screenshot, refresh_monitors
 from output_handler import copy_to_clipboard, save_to_file
 from services.input_automation_service import InputAutomationService
+from utils.chunk_queue import ChunkQueue
+
+# 文件保存、剪贴板等输出副作用在后台执行，不阻塞录音结束后的界面更新
+_io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='viio')
+# 截图与视觉分析固定在同一个线程中执行，截图工具按线程缓存的 mss 实例可以在多次录音间复用
+_vision_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vision')
 
 class Communicate(QObject):
     """用于跨线程通信的信号类"""
     toggle_signal = Signal(bool, object)
-    transcription_update_signal = Signal(str, bool)  # 信号：(文本, 是否追加)
 
 def setup_logging():
     """配置日志记录"""
@@ -45,6 +51,9 @@ def main():
     logger = logging.getLogger(__name__)
 
     app = QApplication(sys.argv)
+    # 显示器增删时让截图工具重新读取显示器布局
+    app.screenAdded.connect(refresh_monitors)
+    app.screenRemoved.connect(refresh_monitors)
     
     try:
         config_loader = ConfigLoader()
@@ -59,14 +68,23 @@ def main():
             correction_config=config['services']['text_correction']
         )
         control_widget = ControlWidget()
-        vision_service = VisionService(config['services']['vision'])
-        enhancement_service = ContentEnhancementService(config['services']['content_enhancement'])
+        # 视觉分析与内容增强服务只在开启增强模式后才会用到，首次使用时再创建（SDK 客户端、RTT 探测等）
+        vision_service = None
+        enhancement_service = None
+        # 内容增强服务延迟创建，但配置错误（提供方不支持、SDK 未安装等）仍在启动时报出
+        ContentEnhancementService.validate_config(config['services']['content_enhancement'])
+        enhancement_service_lock = threading.Lock()
         max_screenshot_width = config['services']['vision'].get('max_width', 1200)
         
         is_recording = False
-        audio_queue = queue.Queue()
+        audio_queue = ChunkQueue(maxsize=recording_service.max_pending_chunks)
+        # 已提交但尚未转录完成的音频块数量上限：达到上限时转录线程等待，
+        # 积压留在有界的 audio_queue 中（满时丢弃最旧的块），而不是在线程池中无限堆积
+        transcription_slots = threading.BoundedSemaphore(recording_service.max_pending_chunks)
+        pending_transcripts = queue.Queue() # 按录音顺序存放转录 Future
         transcription_worker_thread = None
-        vision_worker_thread = None
+        correction_worker_thread = None
+        vision_future = None
         full_transcript = []
         raw_transcript_list = [] # 新增：用于存储原始未修正的文本
         screen_context_result = None
@@ -74,33 +92,52 @@ def main():
         
 
         def transcription_worker():
+            """从音频队列取出音频块并提交并发转录，按顺序把 Future 交给修正线程"""
             min_chunk_samples = int(0.5 * recording_service.sample_rate)
 
             while True:
                 audio_chunk = audio_queue.get()
                 if audio_chunk is None:
-                    audio_queue.task_done()
+                    pending_transcripts.put(None)
                     break
 
                 if len(audio_chunk) < min_chunk_samples:
                     logger.info(f"Skipping a short audio chunk with {len(audio_chunk)} samples.")
-                    audio_queue.task_done()
                     continue
                 
-                duration_seconds = len(audio_chunk) / recording_service.sample_rate
-                logger.info(
-                    f"Sending chunk to ASR: "
-                    f"Duration={duration_seconds:.2f}s, "
-                    f"Samples={len(audio_chunk)}, "
-                    f"Dtype={audio_chunk.dtype}, "
-                    f"Min={np.min(audio_chunk):.0f}, "
-                    f"Max={np.max(audio_chunk):.0f}"
-                )
+                # Min/Max 需要完整遍历一次音频块，只在确实会输出日志时才计算
+                if logger.isEnabledFor(logging.INFO):
+                    duration_seconds = len(audio_chunk) / recording_service.sample_rate
+                    logger.info(
+                        f"Sending chunk to ASR: "
+                        f"Duration={duration_seconds:.2f}s, "
+                        f"Samples={len(audio_chunk)}, "
+                        f"Dtype={audio_chunk.dtype}, "
+                        f"Min={np.min(audio_chunk):.0f}, "
+                        f"Max={np.max(audio_chunk):.0f}"
+                    )
                 
-                transcript = asr_service.transcribe_audio_data(
-                    audio_chunk,
-                    sample_rate=recording_service.sample_rate
-                )
+                transcription_slots.acquire()
+                try:
+                    future = asr_service.submit_audio_data(
+                        audio_chunk,
+                        sample_rate=recording_service.sample_rate
+                    )
+                except Exception:
+                    transcription_slots.release()
+                    raise
+                future.add_done_callback(lambda _future: transcription_slots.release())
+                pending_transcripts.put(future)
+            logger.info("Transcription worker finished.")
+
+        def correction_worker():
+            """按提交顺序等待转录结果并逐块修正，保证文本顺序与录音一致"""
+            while True:
+                future = pending_transcripts.get()
+                if future is None:
+                    break
+
+                transcript = future.result()
                 
                 if transcript:
                     logger.info(f"实时转录 (原始): {transcript}")
@@ -110,20 +147,28 @@ def main():
                     logger.info(f"实时转录 (修正): {corrected_chunk}")
                     
                     full_transcript.append(corrected_chunk)
-                    current_full_text = ' '.join(full_transcript)
-                    logger.info(f"当前完整文本: {current_full_text}")
-                    communicator.transcription_update_signal.emit(current_full_text, False) # False表示覆盖
-                
-                audio_queue.task_done()
-            logger.info("Transcription worker finished.")
+                    # 只发送新修正的一块，界面在已有文本末尾追加
+                    control_widget.transcription_updated.emit(corrected_chunk, True) # True表示追加
+            logger.info("Correction worker finished.")
         
         communicator = Communicate()
         
-        # 连接转写更新信号到UI控件
-        communicator.transcription_update_signal.connect(control_widget.update_transcription) # 连接信号到槽
-        
+        def get_vision_service() -> VisionService:
+            nonlocal vision_service
+            if vision_service is None:
+                vision_service = VisionService(config['services']['vision'])
+            return vision_service
+
+        def get_enhancement_service() -> ContentEnhancementService:
+            nonlocal enhancement_service
+            # 通常由视觉线程首先创建；加锁避免与停止录音时的调用重复创建
+            with enhancement_service_lock:
+                if enhancement_service is None:
+                    enhancement_service = ContentEnhancementService(config['services']['content_enhancement'])
+                return enhancement_service
+
         def handle_toggle_recording(start: bool, window=None):
-            nonlocal is_recording, transcription_worker_thread, vision_worker_thread, full_transcript, screen_context_result, raw_transcript_list, focused_window_at_start
+            nonlocal is_recording, transcription_worker_thread, correction_worker_thread, vision_future, full_transcript, screen_context_result, raw_transcript_list, focused_window_at_start
             
             enhancement_enabled = config['services']['content_enhancement'].get('enabled', False)
 
@@ -136,28 +181,38 @@ def main():
                     def vision_worker():
                         nonlocal screen_context_result
                         logger.info("Capturing and analyzing screen...")
-                        screenshot = take_screenshot()
-                        resized_screenshot = resize_image(screenshot, max_screenshot_width)
-                        save_screenshot(resized_screenshot)
-                        screen_context_result = vision_service.analyze_screenshot(resized_screenshot)
-                        logger.info("Screen analysis complete.")
-                    vision_worker_thread = threading.Thread(target=vision_worker, daemon=True)
-                    vision_worker_thread.start()
+                        try:
+                            screenshot = take_screenshot()
+                            resized_screenshot = resize_image(screenshot, max_screenshot_width)
+                            save_screenshot(resized_screenshot)
+                            screen_context_result = get_vision_service().analyze_screenshot(resized_screenshot)
+                            logger.info("Screen analysis complete.")
+                        except Exception as e:
+                            logger.error(f"Screen capture/analysis failed: {e}", exc_info=True)
+                            return
+                        # 内容增强服务的创建（SDK 导入、RTT 探测）也在这里完成，不占用停止录音时的 GUI 线程
+                        try:
+                            get_enhancement_service()
+                        except Exception as e:
+                            logger.error(f"Failed to initialize content enhancement service: {e}", exc_info=True)
+                    vision_future = _vision_pool.submit(vision_worker)
                 else:
                     screen_context_result = None
-                    vision_worker_thread = None
+                    vision_future = None
 
                 full_transcript = []
                 raw_transcript_list = []
-                while not audio_queue.empty():
-                    audio_queue.get_nowait()
+                audio_queue.reset()
+                while not pending_transcripts.empty():
+                    pending_transcripts.get_nowait()
 
                 transcription_worker_thread = threading.Thread(target=transcription_worker, daemon=True)
                 transcription_worker_thread.start()
+                correction_worker_thread = threading.Thread(target=correction_worker, daemon=True)
+                correction_worker_thread.start()
                 
                 countdown = config['recording'].get('countdown_seconds', 60)
                 control_widget.set_idle_state()  # 确保清空上一次的结果
-                control_widget.transcription_label.clear()
                 control_widget.set_recording_state(countdown)
                 
                 recording_service.start_recording(audio_queue)
@@ -167,13 +222,15 @@ def main():
                 logger.info("Recording stopped...")
                 
                 recording_service.stop_recording()
-                audio_queue.put(None)
+                audio_queue.close()
                 
                 logger.info("Waiting for transcription and vision analysis to complete...")
                 if transcription_worker_thread:
                     transcription_worker_thread.join(timeout=10.0)
-                if vision_worker_thread:
-                    vision_worker_thread.join(timeout=20.0)
+                if correction_worker_thread:
+                    correction_worker_thread.join(timeout=10.0)
+                if vision_future:
+                    wait([vision_future], timeout=20.0)
 
                 raw_text = ' '.join(raw_transcript_list)
                 corrected_text = ' '.join(full_transcript)
@@ -187,23 +244,21 @@ def main():
 
                 if enhancement_enabled and final_text_for_processing and screen_context_result:
                     logger.info("Enhancing text with screen context...")
-                    enhanced_text_result = enhancement_service.enhance_text(final_text_for_processing, screen_context_result)
-                    logger.info(f"增强后文本: {enhanced_text_result}")
-                    output_text = enhanced_text_result
+                    try:
+                        enhanced_text_result = get_enhancement_service().enhance_text(final_text_for_processing, screen_context_result)
+                        logger.info(f"增强后文本: {enhanced_text_result}")
+                        output_text = enhanced_text_result
+                    except Exception as e:
+                        # 服务无法创建时仍要保存和输出转写文本，并让界面回到完成状态
+                        logger.error(f"Content enhancement unavailable, falling back to transcript: {e}", exc_info=True)
                 elif not enhancement_enabled:
                     logger.info("Content enhancement is disabled. Skipping.")
                 elif not screen_context_result:
                      logger.warning("Vision analysis failed or returned no result. Falling back to transcript.")
 
-                if output_text:
-                    if config['output'].get('mode', 'clipboard') == 'paste' and focused_window_at_start:
-                        InputAutomationService.paste_to_window(focused_window_at_start, output_text)
-                    else:
-                        copy_to_clipboard(output_text)
-                else:
-                    logger.warning("没有识别到任何文本，跳过输出。")
-
-                save_to_file(
+                # 保存文件交给后台线程；剪贴板通过 QClipboard 在 GUI 线程直接写入，无需子进程
+                _io_pool.submit(
+                    save_to_file,
                     raw_text=raw_text,
                     corrected_text=corrected_text,
                     enhanced_text=enhanced_text_result,
@@ -211,8 +266,17 @@ def main():
                 )
 
                 # set_finished_state 内部会调用 update_transcription(text, append=False)
-                # 这会用最终文本覆盖掉实时追加的内容
+                # 这会用最终文本覆盖掉实时追加的内容；先更新界面，再输出结果
                 control_widget.set_finished_state(output_text or "")
+
+                if output_text:
+                    if config['output'].get('mode', 'clipboard') == 'paste' and focused_window_at_start:
+                        # 粘贴需要激活目标窗口并等待其就绪，放到后台线程，避免阻塞界面
+                        _io_pool.submit(InputAutomationService.paste_to_window, focused_window_at_start, output_text)
+                    else:
+                        copy_to_clipboard(output_text)
+                else:
+                    logger.warning("没有识别到任何文本，跳过输出。")
                 focused_window_at_start = None
 
         communicator.toggle_signal.connect(handle_toggle_recording)
@@ -227,8 +291,13 @@ def main():
                 handle_toggle_recording(False)
 
             if transcription_worker_thread and transcription_worker_thread.is_alive():
-                audio_queue.put(None)
+                audio_queue.close()
                 transcription_worker_thread.join(timeout=5.0)
+            if correction_worker_thread and correction_worker_thread.is_alive():
+                correction_worker_thread.join(timeout=5.0)
+            asr_service.shutdown(wait=False)
+            _vision_pool.shutdown(wait=False)
+            _io_pool.shutdown(wait=True)
 
             logger.info("Shutdown complete.")
             QApplication.quit()
@@ -9,14 +9,27 @@ from datetime import datetime
 import os
 import json
 
+from PySide6.QtCore import QThread
+from PySide6.QtGui import QGuiApplication
+
 
 def copy_to_clipboard(text: str):
     """
     Copies the given text to the system clipboard.
 
+    On the Qt GUI thread the text is set through QClipboard, which talks to the
+    windowing system directly. Elsewhere (or without a running QApplication) it
+    falls back to pyperclip, which spawns a platform clipboard tool.
+
     Args:
         text (str): The text to be copied.
     """
+    app = QGuiApplication.instance()
+    if app is not None and QThread.currentThread() == app.thread():
+        app.clipboard().setText(text)
+        print("✅ Text copied to clipboard.")
+        return
+
     try:
         pyperclip.copy(text)
         print("✅ Text copied to clipboard.")
@@ -1,10 +1,13 @@
-import os
 import logging
 import numpy as np
-from groq import Groq
+from groq import Groq, APITimeoutError
 from typing import Optional, Union
+from concurrent.futures import Future, ThreadPoolExecutor
 import io
 
+from utils.client_factory import GROQ_TRANSIENT_ERRORS, get_groq_client
+from utils.latency_tracker import LatencyTracker
+
 class ASRService:
     """语音识别服务，使用Groq官方Python客户端"""
     
@@ -18,20 +21,27 @@ class ASRService:
         self.asr_client = self._init_client(self.asr_config)
         self.correction_client = self._init_client(self.correction_config)
 
+        # 并发转录线程池：连续的短句可以同时提交，而不必串行等待上一个结果
+        self.max_concurrency = self.asr_config.get('max_concurrency', 4)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='asr')
+
+        # 根据实测延迟动态设置修正请求的超时时间，避免偶发卡住的请求拖到 SDK 默认的超长超时；
+        # RTT 探测在后台进行，网络较慢时不拖慢应用启动
+        self.correction_latency = LatencyTracker('text_correction')
+        self.correction_latency.measure_rtt_in_background(
+            lambda: self.correction_client.with_options(timeout=3.0, max_retries=0).models.list()
+        )
+
     def _init_client(self, config: dict) -> Groq:
         """根据配置初始化客户端"""
         api_key = config.get('api_key')
         if not api_key:
             raise ValueError(f"API key not found for provider {config.get('provider')}")
 
-        # 代理设置
-        if self.proxy_config.get('http'):
-            os.environ['HTTP_PROXY'] = self.proxy_config['http']
-            os.environ['HTTPS_PROXY'] = self.proxy_config.get('https', self.proxy_config['http'])
-        
         # 目前只支持 Groq，未来可以扩展
         if config.get('provider') == 'groq':
-            return Groq(api_key=api_key)
+            # ASR 与修正使用相同密钥时共用同一个客户端（及其连接池）
+            return get_groq_client(api_key, self.proxy_config)
         else:
             raise NotImplementedError(f"Provider '{config.get('provider')}' is not supported in ASRService.")
         
@@ -100,6 +110,20 @@ class ASRService:
             self.logger.error(f"ASR transcription from data failed: {e}", exc_info=True)
             return None
 
+    def submit_audio_data(self, audio_data: np.ndarray, sample_rate: int, language: str = "zh") -> Future:
+        """
+        将音频块提交到后台线程池进行转录，立即返回。
+        最多同时有 max_concurrency 个请求在进行中，多余的请求在线程池中排队。
+
+        Returns:
+            Future: 结果与 transcribe_audio_data 相同（文本或 None）。
+        """
+        return self._executor.submit(self.transcribe_audio_data, audio_data, sample_rate, language)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭转录线程池"""
+        self._executor.shutdown(wait=wait)
+
     def correct_text(self, text: str) -> str:
         """
         使用LLM修正和优化ASR识别出的文本。
@@ -115,28 +139,32 @@ class ASRService:
             return text
 
         try:
-            chat_completion = self.correction_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "你是一个专业的速记员和文本修正师。"
-                            "你的任务是修正ASR（自动语音识别）的输出结果，而不是润色或再创作。"
-                            "请严格遵循以下规则：\n"
-                            "1.  **仅**根据整体文本内容，找出可能存在的发音相似但明显错误的词语（例如，错别字），然后修正。\n"
-                            "2.  根据上下文添加合理且必要的标点符号，使句子结构完整。\n"
-                            "3.  如果内容包含代码或专业术语，请确保其格式正确。\n"
-                            "4.  务必结合上下文，分析已有的结果，由于结果来自语音识别，必然存在噪音、其他人说话干扰导致的额外文字、模糊语音识别错误，从正常的、自然的、普通的逻辑出发，理解内容，并找出可疑的内容，修正它们。你要输出的是合理的文字，而不是明显语义奇怪的内容\n"
-                            "5.  直接输出修正后的文本，仅指包含任何与原始文本内容无关的解释或额外说明。"
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": f"请修正以下ASR识别结果：\n\n{text}\n\n 输出格式：\n[修正后的文本内容]",
-                    }
-                ],
-                model=self.correction_config['model'],
-                temperature=self.correction_config.get('temperature', 0.7),
+            chat_completion = self.correction_latency.call(
+                lambda timeout: self.correction_client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": (
+                                "你是一个专业的速记员和文本修正师。"
+                                "你的任务是修正ASR（自动语音识别）的输出结果，而不是润色或再创作。"
+                                "请严格遵循以下规则：\n"
+                                "1.  **仅**根据整体文本内容，找出可能存在的发音相似但明显错误的词语（例如，错别字），然后修正。\n"
+                                "2.  根据上下文添加合理且必要的标点符号，使句子结构完整。\n"
+                                "3.  如果内容包含代码或专业术语，请确保其格式正确。\n"
+                                "4.  务必结合上下文，分析已有的结果，由于结果来自语音识别，必然存在噪音、其他人说话干扰导致的额外文字、模糊语音识别错误，从正常的、自然的、普通的逻辑出发，理解内容，并找出可疑的内容，修正它们。你要输出的是合理的文字，而不是明显语义奇怪的内容\n"
+                                "5.  直接输出修正后的文本，仅指包含任何与原始文本内容无关的解释或额外说明。"
+                            )
+                        },
+                        {
+                            "role": "user",
+                            "content": f"请修正以下ASR识别结果：\n\n{text}\n\n 输出格式：\n[修正后的文本内容]",
+                        }
+                    ],
+                    model=self.correction_config['model'],
+                    temperature=self.correction_config.get('temperature', 0.7),
+                ),
+                retry_on=(APITimeoutError,),
+                transient_on=GROQ_TRANSIENT_ERRORS
             )
             corrected_text = chat_completion.choices[0].message.content
             return corrected_text.strip() if corrected_text else text
@@ -1,11 +1,83 @@
 import os
 import logging
 import re
-from google import genai
-from google.genai import types
-from groq import Groq
+import importlib.util
+
+from utils.client_factory import GROQ_TRANSIENT_ERRORS, get_genai_client, get_groq_client
+from utils.latency_tracker import LatencyTracker
+
+# 单个关键元素描述的最大长度，避免屏幕上下文撑大提示词
+_MAX_ELEMENT_DESCRIPTION_CHARS = 200
+# 粗略估算（字符数 / 3）超过该 token 数时记录警告
+_PROMPT_TOKEN_WARNING_THRESHOLD = 4000
+# 推理模型输出中的思考过程
+_THINK_RE = re.compile(r'<think>.*?</think>', re.DOTALL)
+
+_ENHANCEMENT_PROMPT_TEMPLATE = """
+任务目标：根据视觉识别理解的当前用户屏幕上下文，和用户语音输入转义的文本，理解用户当前面临的场景以及用户表达的意图，为用户生成用于输入的内容。内容应该是完整连贯的，符合用户当前的操作场景，符合用户意图。
+
+规范与行动指南：
+- 用户语音ASR 转写的内容可以被认为是99%正确的，不存在歧义的情况下，尽可能避免修改语音文本的原意。
+- 如果用户表达的是一个指令，例如表达“替我撰写”的语义，则你按指令要求生成最终文本。
+- 如何识别用户表达的是指令还是期望输入的内容：结合屏幕上下文。
+- 如果用户的表达带有情绪，那么审视这种情绪通过文字传递到场景时是否恰当。
+    - 恰当的标准：
+        - 人际交流中，不应该有过度的情绪表达。
+        - 人机交互中，无需体现过度情绪，应该从用户情绪中理解用户真正想要陈述的内容重点。
+        - 特例：当上下文中充斥着情绪表达时，那么服从用户的情绪表达，甚至你应该让用户的情绪表达通过文字传递更精彩，例如贴吧嘴臭哥那种高潮的情绪表达。
+- 如果用户正在编写代码，那么帮助用户用更详细且符合上下文信息的方式增强他的描述。
+- 如果用户正在撰写文章，则将其转化为完整的句子或段落。
+- 如果用户正在搜索，则创建一个精确的搜索查询。
+- 如果……
+
+**屏幕上下文:**
+- **主要活动:** {main_activity}
+- **关键元素:**
+{key_elements}
+- **上下文总结:** {context_summary}
+
+**用户原始语音文本:**
+"{transcript}"
+
+**输出格式要求:**
+仅允许输出可以直接用于输入在input区域的文本内容，**不允许**包含其他无关的解释、自白、思考信息或总结。
+        """
+
+
+def _google_chunk_text(chunk):
+    """Google GenAI 流式响应块中的文本"""
+    return chunk.text
+
+
+def _openai_chunk_text(chunk):
+    """Groq / OpenAI 兼容流式响应块中的文本"""
+    return chunk.choices[0].delta.content if chunk.choices else None
+
 
 class ContentEnhancementService:
+    # 提供方及其 SDK 模块
+    _PROVIDER_MODULES = {'google': 'google.genai', 'groq': 'groq'}
+
+    @classmethod
+    def validate_config(cls, config: dict) -> None:
+        """
+        检查配置能否创建服务（API 密钥、提供方、SDK 是否已安装），但不导入 SDK、不发起请求。
+        服务在首次使用时才创建，启动时调用此方法，让配置错误像以前一样在启动时暴露。
+
+        Raises:
+            ValueError: 缺少 API 密钥。
+            NotImplementedError: 不支持的提供方。
+            ImportError: 提供方的 SDK 未安装。
+        """
+        provider = config.get('provider')
+        if not config.get('api_key'):
+            raise ValueError(f"API key not found for provider {provider}")
+        module = cls._PROVIDER_MODULES.get(provider)
+        if module is None:
+            raise NotImplementedError(f"Provider '{provider}' is not supported in ContentEnhancementService.")
+        if importlib.util.find_spec(module) is None:
+            raise ImportError(f"SDK module '{module}' for provider '{provider}' is not installed.")
+
     def __init__(self, config: dict):
         """
         初始化内容增强服务。
@@ -13,21 +85,43 @@ class ContentEnhancementService:
         Args:
             config (dict): 解析后的 'content_enhancement' 服务配置。
         """
-        api_key = config.get('api_key')
-        if not api_key:
-            raise ValueError(f"API key not found for provider {config.get('provider')}")
+        self.validate_config(config)
+        api_key = config['api_key']
 
+        # 只导入所用提供方的 SDK（google-genai 导入开销较大）；
+        # 按提供方预先绑定请求函数和流式响应块的文本提取函数，每次请求时无需再判断提供方
         provider = config.get('provider')
         if provider == 'google':
-            self.client = genai.Client(api_key=api_key)
+            from google.genai import types
+            self._types = types
+            self.client = get_genai_client(api_key)
+            # 生成配置不随请求变化，创建一次后重复使用
+            self._gen_config = types.GenerateContentConfig(
+                thinking_config=types.ThinkingConfig(thinking_budget=0),
+                response_mime_type="text/plain",
+            )
+            self._generate = self._generate_google
+            self._chunk_text = _google_chunk_text
         elif provider == 'groq':
-            self.client = Groq(api_key=api_key)
+            from groq import APITimeoutError
+            self._timeout_errors = (APITimeoutError,)
+            self.client = get_groq_client(api_key)
+            self._generate = self._generate_groq
+            self._chunk_text = _openai_chunk_text
         else:
             raise NotImplementedError(f"Provider '{provider}' is not supported in ContentEnhancementService.")
             
+        self.provider = provider
         self.model = config['model']
         self.logger = logging.getLogger(__name__)
 
+        # Groq 请求的超时时间根据实测延迟动态调整
+        self.latency = LatencyTracker('content_enhancement')
+        if provider == 'groq':
+            self.latency.measure_rtt(
+                lambda: self.client.with_options(timeout=3.0, max_retries=0).models.list()
+            )
+
     def enhance_text(self, transcript: str, screen_context: dict) -> str:
         """
         根据语音和视觉上下文增强文本。
@@ -40,86 +134,32 @@ class ContentEnhancementService:
             str: 增强后的文本。
         """
         
-        # 格式化关键元素以获得更好的可读性
+        # 用生成器直接拼接关键元素，截断过长的描述并跳过空条目，控制发送给 LLM 的 token 数
         key_elements_str = "\n".join(
-            [
-                f"  - 类型: {el.get('element_type', 'N/A')}, "
-                f"描述: {el.get('description', 'N/A')}, "
-                f"是否激活: {'是' if el.get('is_active') else '否'}"
-                for el in screen_context.get('key_elements', [])
-            ]
+            f"  - 类型: {el.get('element_type', 'N/A')}, "
+            f"描述: {(el.get('description') or 'N/A')[:_MAX_ELEMENT_DESCRIPTION_CHARS]}, "
+            f"是否激活: {'是' if el.get('is_active') else '否'}"
+            for el in screen_context.get('key_elements', [])
+            if el.get('description') or el.get('element_type', 'N/A') != 'N/A'
         )
 
-        prompt = f"""
-任务目标：根据视觉识别理解的当前用户屏幕上下文，和用户语音输入转义的文本，理解用户当前面临的场景以及用户表达的意图，为用户生成用于输入的内容。内容应该是完整连贯的，符合用户当前的操作场景，符合用户意图。
-
-规范与行动指南：
-- 用户语音ASR 转写的内容可以被认为是99%正确的，不存在歧义的情况下，尽可能避免修改语音文本的原意。
-- 如果用户表达的是一个指令，例如表达“替我撰写”的语义，则你按指令要求生成最终文本。
-- 如何识别用户表达的是指令还是期望输入的内容：结合屏幕上下文。
-- 如果用户的表达带有情绪，那么审视这种情绪通过文字传递到场景时是否恰当。
-    - 恰当的标准：
-        - 人际交流中，不应该有过度的情绪表达。
-        - 人机交互中，无需体现过度情绪，应该从用户情绪中理解用户真正想要陈述的内容重点。
-        - 特例：当上下文中充斥着情绪表达时，那么服从用户的情绪表达，甚至你应该让用户的情绪表达通过文字传递更精彩，例如贴吧嘴臭哥那种高潮的情绪表达。
-- 如果用户正在编写代码，那么帮助用户用更详细且符合上下文信息的方式增强他的描述。
-- 如果用户正在撰写文章，则将其转化为完整的句子或段落。
-- 如果用户正在搜索，则创建一个精确的搜索查询。
-- 如果……
-
-**屏幕上下文:**
-- **主要活动:** {screen_context.get('main_activity', 'N/A')}
-- **关键元素:**
-{key_elements_str if key_elements_str else '  - 未识别到关键元素'}
-- **上下文总结:** {screen_context.get('full_context_summary', 'N/A')}
-
-**用户原始语音文本:**
-"{transcript}"
-
-**输出格式要求:**
-仅允许输出可以直接用于输入在input区域的文本内容，**不允许**包含其他无关的解释、自白、思考信息或总结。
-        """
+        prompt = _ENHANCEMENT_PROMPT_TEMPLATE.format(
+            main_activity=screen_context.get('main_activity', 'N/A'),
+            key_elements=key_elements_str if key_elements_str else '  - 未识别到关键元素',
+            context_summary=screen_context.get('full_context_summary', 'N/A'),
+            transcript=transcript,
+        )
+        estimated_tokens = len(prompt) // 3
+        if estimated_tokens > _PROMPT_TOKEN_WARNING_THRESHOLD:
+            self.logger.warning(f"Enhancement prompt is large (~{estimated_tokens} tokens), consider trimming screen context.")
         
         try:
             self.logger.info("Sending data for content enhancement...")
-            # 根据客户端类型调用不同的方法
-            if isinstance(self.client, genai.Client):
-                contents = [
-                    genai.types.Content(
-                        role="user",
-                        parts=[genai.types.Part.from_text(text=prompt)]
-                    )
-                ]
-                generate_content_config = types.GenerateContentConfig(
-                    thinking_config=types.ThinkingConfig(thinking_budget=0),
-                    response_mime_type="text/plain",
-                )
-                stream = self.client.models.generate_content_stream(
-                    model=self.model,
-                    contents=contents,
-                    config=generate_content_config,
-                )
-            else: # 假设是 Groq 或其他 OpenAI 兼容的客户端
-                messages = [{"role": "user", "content": prompt}]
-                stream = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    stream=True
-                )
-
-            response = ""
-            for chunk in stream:
-                # 处理不同客户端返回的 chunk 结构
-                if hasattr(chunk, 'text'): # Google GenAI
-                    response += chunk.text
-                elif hasattr(chunk, 'choices') and chunk.choices: # OpenAI-like
-                    content = chunk.choices[0].delta.content
-                    if content:
-                        response += content
+            response = self._generate(prompt)
             
-            if isinstance(self.client, Groq):
+            if self.provider == 'groq':
                 self.logger.info(f"Original response from groq: {response}")
-                response = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL)
+                response = _THINK_RE.sub('', response)
 
             self.logger.info(f"Enhanced text received: {response}")
             return response.strip()
@@ -127,3 +167,44 @@ class ContentEnhancementService:
             self.logger.error(f"Error enhancing text: {e}", exc_info=True)
             # 在增强失败时，优雅地回退到原始文本
             return transcript
+
+    def _generate_google(self, prompt: str) -> str:
+        """通过 Google GenAI 流式生成并返回完整文本"""
+        types = self._types
+        contents = [
+            types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=prompt)]
+            )
+        ]
+        stream = self.client.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=self._gen_config,
+        )
+        return self._consume_stream(stream)
+
+    def _generate_groq(self, prompt: str) -> str:
+        """通过 Groq（OpenAI 兼容接口）流式生成并返回完整文本，超时时间由延迟跟踪器动态调整"""
+        messages = [{"role": "user", "content": prompt}]
+        return self.latency.call(
+            lambda timeout: self._consume_stream(
+                self.client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    stream=True
+                )
+            ),
+            retry_on=self._timeout_errors,
+            transient_on=GROQ_TRANSIENT_ERRORS
+        )
+
+    def _consume_stream(self, stream) -> str:
+        """读取流式响应并拼接为完整文本（收集到列表后一次 join，避免逐块字符串拼接）"""
+        chunk_text = self._chunk_text
+        parts = []
+        for chunk in stream:
+            text = chunk_text(chunk)
+            if text:
+                parts.append(text)
+        return "".join(parts)
@@ -1,12 +1,75 @@
+import math
 import sounddevice as sd
 import numpy as np
 from typing import Optional, Callable
 import threading
 import logging
+from collections import deque
 import soundfile as sf
 from pathlib import Path
-import queue
-import audioop
+
+from utils.chunk_queue import ChunkQueue
+
+try:
+    from numba import njit
+except ImportError: # numba 为可选依赖，未安装时使用 NumPy 实现
+    njit = None
+
+
+# 保存录音时每次标准化并写出的帧数（int16 单声道约 128KB，可留在缓存中）
+_SAVE_BLOCK_FRAMES = 65536
+
+
+def _sumsq_i16(x: np.ndarray) -> int:
+    """
+    计算 int16 音频的平方和。
+    int16 的平方不超过 2**30，可以直接用 int32 存放，只有求和时才需要 int64 累加器。
+    """
+    return int(np.square(x, dtype=np.int32).sum(dtype=np.int64))
+
+
+def _rms_i16(x: np.ndarray) -> float:
+    """计算 int16 音频的 RMS"""
+    if x.size == 0:
+        return 0.0
+    return math.sqrt(_sumsq_i16(x) / x.size)
+
+
+def _window_sumsq_numpy(samples: np.ndarray, step: int) -> tuple[int, np.ndarray]:
+    """
+    计算能量包络：将 samples 从末尾对齐切成长度为 step 的窗口，返回
+    (开头不足一个窗口部分的平方和, 每个窗口的平方和数组)。
+    """
+    num_windows = len(samples) // step
+    head = len(samples) - num_windows * step
+    windows = samples[head:].reshape(num_windows, step)
+    return _sumsq_i16(samples[:head]), np.square(windows, dtype=np.int32).sum(axis=1, dtype=np.int64)
+
+
+def _window_sumsq_loop(samples: np.ndarray, step: int) -> tuple[int, np.ndarray]:
+    """与 _window_sumsq_numpy 相同，但逐样本累加，不产生平方临时数组（供 numba 编译）"""
+    num_windows = samples.shape[0] // step
+    head = samples.shape[0] - num_windows * step
+    head_acc = 0
+    for j in range(head):
+        v = np.int32(samples[j])
+        head_acc += np.int64(v * v)
+    envelope = np.empty(num_windows, dtype=np.int64)
+    for k in range(num_windows):
+        acc = 0
+        for j in range(head + k * step, head + (k + 1) * step):
+            v = np.int32(samples[j])
+            acc += np.int64(v * v)
+        envelope[k] = acc
+    return head_acc, envelope
+
+
+# 安装了 numba 时使用编译内核计算能量包络，否则使用向量化的 NumPy 实现
+if njit is not None:
+    _window_sumsq = njit(cache=True)(_window_sumsq_loop)
+else:
+    _window_sumsq = _window_sumsq_numpy
+
 
 class RecordingService:
     """音频录制服务，处理录音、分块和状态管理"""
@@ -19,23 +82,58 @@ class RecordingService:
         self.is_recording = False
         self.recording_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
+        # 切分处理线程：音频回调只写入环形缓冲区并发出通知，切分/RMS/入队都在该线程完成
+        self.processing_thread: Optional[threading.Thread] = None
+        self._data_ready = threading.Event()
+        self._processing_stop = threading.Event()
         self.stream: Optional[sd.InputStream] = None
         self.logger = logging.getLogger(__name__)
+        # 音频回调与切分线程上的日志先放入环形队列，由后台线程写出，避免日志处理器的锁和 I/O
+        self._log_ring: deque = deque(maxlen=1024)
+        self._log_event = threading.Event()
+        self._log_thread = threading.Thread(target=self._drain_log_ring, daemon=True)
+        self._log_thread.start()
         
         # --- 混合切分模式配置 ---
         self.chunk_seconds = recording_config.get('realtime_chunk_seconds', 3)
         self.floor_threshold = recording_config.get('realtime_split_silence_threshold', 100)
         self.split_ratio = recording_config.get('realtime_split_ratio', 0.6)
         self.min_chunk_duration_ms = recording_config.get('min_chunk_duration_ms', 300)
+        # 待转录音频块队列的上限：下游转录跟不上时丢弃最旧的块，而不是无限堆积
+        self.max_pending_chunks = recording_config.get('max_pending_chunks', 8)
+        # 音频流参数：固定 20ms 块大小配合 'high' 延迟，回调次数少且不易欠载；语音转写不需要极低延迟
+        self.blocksize = recording_config.get('blocksize', int(0.02 * self.sample_rate))
+        self.latency = recording_config.get('latency', 'high')
+        # 完整录音的最长时长：倒计时结束后停止录音还需要一点时间，留出少量余量
+        self.max_recording_seconds = recording_config.get('countdown_seconds', 60) + 5
         self.chunk_size = int(self.chunk_seconds * self.sample_rate) # 每个处理周期的帧数
+        self.search_margin_ms = 500 # 在每个处理周期末尾搜索切分点的范围
+        self.split_step_ms = 20 # 搜索切分点时的窗口步长
+
+        # --- 预先计算的帧数常量，避免在处理线程上重复换算 ---
+        self._min_chunk_samples = int((self.min_chunk_duration_ms / 1000) * self.sample_rate)
+        self._margin_frames = int((self.search_margin_ms / 1000) * self.sample_rate)
+        self._step_frames = max(1, int((self.split_step_ms / 1000) * self.sample_rate))
+        self._step_samples = self._step_frames * self.channels
         
         # --- 状态变量 ---
-        self._chunk_queue: Optional[queue.Queue] = None
-        self._buffer: list[np.ndarray] = [] # 主缓冲区，持续接收音频数据
-        self._carry_over_buffer: Optional[np.ndarray] = None # 上一个块未发送的结转部分
-        self._full_audio_data: list[np.ndarray] = []
+        self._chunk_queue: Optional[ChunkQueue] = None
+        # 主缓冲区：预分配的环形缓冲区，回调中只做切片赋值，不再反复分配和拼接数组
+        self._ring_len = 4 * self.chunk_size
+        self._ring = np.empty((self._ring_len, self.channels), dtype=self.dtype)
+        self._write_idx = 0 # 累计写入的帧数
+        self._read_idx = 0 # 累计读出的帧数
+        # 结转缓冲区：前 _pending_len 帧是上一周期未发送的音频，新周期直接从环形缓冲区读到其后，
+        # 发送时只需对前缀切片复制一次，不再每个周期 np.concatenate
+        self._pending = np.empty((2 * self.chunk_size, self.channels), dtype=self.dtype)
+        self._pending_len = 0
+        self._pending_sumsq = 0 # 结转音频的平方和，由能量包络累加得出，发送时无需再遍历一次
+        # 完整录音缓冲区：每次录音开始时按最长时长预分配，回调中直接切片写入
+        self._full_audio: np.ndarray = np.empty((0, self.channels), dtype=self.dtype)
+        self._full_len = 0
+        self._full_dropped_frames = 0
 
-    def start_recording(self, chunk_queue: queue.Queue) -> None:
+    def start_recording(self, chunk_queue: ChunkQueue) -> None:
         """开始录音，并将音频块放入指定的队列"""
         if self.is_recording:
             self.logger.warning("Recording already in progress")
@@ -43,60 +141,112 @@ class RecordingService:
 
         self.is_recording = True
         self._chunk_queue = chunk_queue
-        self._buffer = []
-        self._carry_over_buffer = None
-        self._full_audio_data = []
+        self._write_idx = 0
+        self._read_idx = 0
+        self._pending_len = 0
+        self._pending_sumsq = 0
+        # 每次录音使用新的缓冲区，上一次 stop_recording 返回的视图不会被覆盖
+        self._full_audio = np.empty((int(self.max_recording_seconds * self.sample_rate), self.channels), dtype=self.dtype)
+        self._full_len = 0
+        self._full_dropped_frames = 0
         self.stop_event.clear()
+        self._data_ready.clear()
+        self._processing_stop.clear()
 
+        self.processing_thread = threading.Thread(target=self._process_loop, daemon=True)
+        self.processing_thread.start()
         self.recording_thread = threading.Thread(target=self._run_recording)
         self.recording_thread.start()
         self.logger.info("Recording started")
 
     def _audio_callback(self, indata: np.ndarray, frames: int, time_info, status) -> None:
-        """音频数据回调，实现混合切分逻辑"""
+        """音频数据回调（PortAudio 实时线程），只写入缓冲区并通知处理线程"""
         if status:
-            self.logger.warning(f"Audio stream status: {status}")
+            self._log(logging.WARNING, "Audio stream status: %s", status)
         
-        self._full_audio_data.append(indata.copy())
-        self._buffer.append(indata.copy())
-        
-        # 检查缓冲区是否达到一个处理周期的大小
-        if self.get_buffer_len_in_frames() < self.chunk_size:
-            return
+        self._full_write(indata)
+        self._ring_write(indata)
+        self._data_ready.set()
 
-        # 缓冲区已达到处理周期，开始处理
-        full_buffer_data = np.concatenate(self._buffer)
-        
-        # 取出要处理的块
-        process_chunk_data = full_buffer_data[:self.chunk_size]
-        
-        # 更新缓冲区，保留未处理的部分
-        remaining_buffer_data = full_buffer_data[self.chunk_size:]
-        if remaining_buffer_data.size > 0:
-            self._buffer = [remaining_buffer_data]
-        else:
-            self._buffer = []
+    def _log(self, level: int, msg: str, *args) -> None:
+        """记录日志到环形队列（不做格式化、不获取日志锁），由后台线程写出"""
+        self._log_ring.append((level, msg, args))
+        if not self._log_event.is_set():
+            self._log_event.set()
 
-        # 寻找切分点
-        split_point = self.find_split_point(process_chunk_data)
+    def _drain_log_ring(self) -> None:
+        """后台日志线程：将环形队列中的日志交给真正的 logger"""
+        while True:
+            self._log_event.wait()
+            self._log_event.clear()
+            while self._log_ring:
+                level, msg, args = self._log_ring.popleft()
+                self.logger.log(level, msg, *args)
 
-        if split_point is not None:
-            # 找到了切分点
-            to_send_data = process_chunk_data[:split_point]
-            remaining_data = process_chunk_data[split_point:]
+    def _process_loop(self) -> None:
+        """处理线程：每凑满一个处理周期的数据就执行一次混合切分"""
+        while not self._processing_stop.is_set():
+            self._data_ready.wait(timeout=0.1)
+            self._data_ready.clear()
+            self._drain_full_chunks()
+        # 音频流已关闭，处理最后写入的完整周期
+        self._drain_full_chunks()
 
-            # 合并上次结转的音频
-            if self._carry_over_buffer is not None and self._carry_over_buffer.size > 0:
-                to_send_data = np.concatenate([self._carry_over_buffer, to_send_data])
-            
-            self.send_chunk(to_send_data)
-            self._carry_over_buffer = remaining_data
-        else:
-            # 未找到切分点，将整个块作为结转音频
-            if self._carry_over_buffer is not None and self._carry_over_buffer.size > 0:
-                self._carry_over_buffer = np.concatenate([self._carry_over_buffer, process_chunk_data])
-            else:
-                self._carry_over_buffer = process_chunk_data
+    def _drain_full_chunks(self) -> None:
+        """处理环形缓冲区中所有完整的处理周期"""
+        overrun = self.get_buffer_len_in_frames() - self._ring_len
+        if overrun > 0:
+            # 处理线程落后超过整个环形缓冲区，最旧的数据已被覆盖，直接跳过
+            self._log(logging.WARNING, "Ring buffer overrun, dropping %d frames.", overrun)
+            self._read_idx += overrun
+        while self.get_buffer_len_in_frames() >= self.chunk_size:
+            self._process_chunk()
+
+    def _process_chunk(self) -> None:
+        """读出一个处理周期接在结转音频之后，寻找切分点，发送切分点之前的全部音频，其余继续结转"""
+        carry_len = self._pending_len
+        self._pending_reserve(carry_len + self.chunk_size)
+        process_chunk_data = self._pending[carry_len:carry_len + self.chunk_size]
+        self._ring_read(self.chunk_size, out=process_chunk_data)
+        self._pending_len = carry_len + self.chunk_size
+
+        # 能量包络每个周期只计算一次，切分点搜索和发送前的音量检查共用
+        envelope = self._envelope(process_chunk_data)
+        head_sumsq, window_sumsq = envelope
+        split_point = self.find_split_point(process_chunk_data, envelope)
+        if split_point is None:
+            # 未找到切分点，整个周期留在结转缓冲区中
+            self._pending_sumsq += head_sumsq + int(window_sumsq.sum())
+            return
+
+        # 找到了切分点：结转音频 + 本周期切分点之前的部分一起发送，剩余部分移到缓冲区开头。
+        # 切分点总落在包络窗口边界上，两部分的平方和都可以直接由包络求出
+        head_samples = process_chunk_data.size - len(window_sumsq) * self._step_samples
+        split_window = (split_point * self.channels - head_samples) // self._step_samples
+        send_sumsq = self._pending_sumsq + head_sumsq + int(window_sumsq[:split_window].sum())
+        send_len = carry_len + split_point
+        to_send_data = self._pending[:send_len].copy()
+        remaining = self._pending_len - send_len
+        self._pending[:remaining] = self._pending[send_len:self._pending_len]
+        self._pending_len = remaining
+        self._pending_sumsq = int(window_sumsq[split_window:].sum())
+        self.send_chunk(to_send_data, send_sumsq)
+
+    def _envelope(self, data: np.ndarray) -> tuple[int, np.ndarray]:
+        """计算 data 按切分步长从末尾对齐的能量包络：(开头不足一个窗口部分的平方和, 每个窗口的平方和)"""
+        head_sumsq, window_sumsq = _window_sumsq(data.reshape(-1), self._step_samples)
+        return int(head_sumsq), window_sumsq
+
+    def _pending_reserve(self, frames: int) -> None:
+        """确保结转缓冲区至少能容纳指定帧数，不足时按倍数扩容并保留已有内容"""
+        capacity = len(self._pending)
+        if frames <= capacity:
+            return
+        while capacity < frames:
+            capacity *= 2
+        grown = np.empty((capacity, self.channels), dtype=self.dtype)
+        grown[:self._pending_len] = self._pending[:self._pending_len]
+        self._pending = grown
 
     def _run_recording(self) -> None:
         """运行录音线程，管理音频流的生命周期"""
@@ -106,8 +256,8 @@ class RecordingService:
                 channels=self.channels,
                 dtype=self.dtype,
                 callback=self._audio_callback,
-                blocksize=0, # 使用0让sounddevice自动选择最佳块大小
-                latency='low'
+                blocksize=self.blocksize,
+                latency=self.latency
             ) as self.stream:
                 self.stop_event.wait()
         except Exception as e:
@@ -117,84 +267,109 @@ class RecordingService:
             self.logger.info("Recording stream closed.")
 
     def get_buffer_len_in_frames(self) -> int:
-        """计算主缓冲区中的总帧数"""
-        if not self._buffer:
-            return 0
-        return sum(len(chunk) for chunk in self._buffer)
+        """计算主缓冲区中尚未处理的帧数"""
+        return self._write_idx - self._read_idx
+
+    def _full_write(self, data: np.ndarray) -> None:
+        """将音频数据追加到完整录音缓冲区，超出最长时长的部分被丢弃并计数"""
+        frames = min(len(data), len(self._full_audio) - self._full_len)
+        if frames > 0:
+            self._full_audio[self._full_len:self._full_len + frames] = data[:frames]
+            self._full_len += frames
+        self._full_dropped_frames += len(data) - frames
+
+    def _ring_write(self, data: np.ndarray) -> None:
+        """将音频数据写入环形缓冲区，必要时分两段写入（回绕）"""
+        frames = len(data)
+        start = self._write_idx % self._ring_len
+        end = start + frames
+        if end <= self._ring_len:
+            self._ring[start:end] = data
+        else:
+            first = self._ring_len - start
+            self._ring[start:] = data[:first]
+            self._ring[:end - self._ring_len] = data[first:]
+        self._write_idx += frames
 
-    def send_chunk(self, audio_data: np.ndarray):
-        """对音频块进行预检，如果有效则放入队列"""
+    def _ring_read(self, frames: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """从环形缓冲区读出指定帧数；给出 out 时直接写入 out，否则返回一份独立的连续数组"""
+        if out is None:
+            out = np.empty((frames, self.channels), dtype=self.dtype)
+        start = self._read_idx % self._ring_len
+        end = start + frames
+        if end <= self._ring_len:
+            out[:] = self._ring[start:end]
+        else:
+            first = self._ring_len - start
+            out[:first] = self._ring[start:]
+            out[first:] = self._ring[:end - self._ring_len]
+        self._read_idx += frames
+        return out
+
+    def send_chunk(self, audio_data: np.ndarray, sumsq: Optional[int] = None):
+        """对音频块进行预检，如果有效则放入队列；已知平方和时通过 sumsq 传入，省去一次遍历"""
         # --- 预检 1: 检查时长 ---
-        min_chunk_samples = int((self.min_chunk_duration_ms / 1000) * self.sample_rate)
-        if audio_data.size < min_chunk_samples:
-            self.logger.info(f"Skipping chunk: too short ({len(audio_data)} samples).")
+        if audio_data.size < self._min_chunk_samples:
+            self._log(logging.INFO, "Skipping chunk: too short (%d samples).", len(audio_data))
             return
 
         # --- 预检 2: 检查音量 ---
-        try:
-            avg_rms = audioop.rms(audio_data.tobytes(), 2)
-            if avg_rms < self.floor_threshold:
-                self.logger.info(f"Skipping chunk: too quiet (RMS: {avg_rms:.2f}).")
-                return
-        except Exception:
-            self.logger.warning("Skipping chunk: could not calculate RMS for pre-check.")
+        if audio_data.size == 0:
+            return
+        if sumsq is None:
+            sumsq = _sumsq_i16(audio_data)
+        avg_rms = math.sqrt(sumsq / audio_data.size)
+        if avg_rms < self.floor_threshold:
+            self._log(logging.INFO, "Skipping chunk: too quiet (RMS: %.2f).", avg_rms)
             return
 
         # --- 通过所有预检，发送音频块 ---
-        if self._chunk_queue:
-            self.logger.info(f"Putting chunk of {len(audio_data)} samples into queue (RMS: {avg_rms:.2f}).")
-            self._chunk_queue.put(audio_data)
+        if self._chunk_queue is not None:
+            self._log(logging.INFO, "Putting chunk of %d samples into queue (RMS: %.2f).", len(audio_data), avg_rms)
+            if not self._chunk_queue.put(audio_data):
+                self._log(logging.WARNING, "Chunk queue full (%d), dropped the oldest pending chunk.", self.max_pending_chunks)
+
+    def find_split_point(self, data: np.ndarray, envelope: Optional[tuple[int, np.ndarray]] = None) -> Optional[int]:
+        """在音频数据块的末尾使用动态阈值向前搜索一个静音点；envelope 为 _envelope(data) 的结果，未给出时现场计算"""
+        if data.size == 0:
+            return None
+        if envelope is None:
+            envelope = self._envelope(data)
+        head_sumsq, window_sumsq = envelope
 
-    def find_split_point(self, data: np.ndarray, search_margin_ms: int = 500) -> Optional[int]:
-        """在音频数据块的末尾使用动态阈值向前搜索一个静音点"""
         # --- 1. 计算动态阈值 ---
-        try:
-            avg_rms = audioop.rms(data.tobytes(), 2)
-            dynamic_threshold = avg_rms * self.split_ratio
-            effective_threshold = max(dynamic_threshold, self.floor_threshold)
-        except Exception as e:
-            self.logger.warning(f"Could not calculate average RMS for dynamic threshold, falling back to floor. Error: {e}")
-            effective_threshold = self.floor_threshold
+        avg_rms = math.sqrt((head_sumsq + int(window_sumsq.sum())) / data.size)
+        dynamic_threshold = avg_rms * self.split_ratio
+        effective_threshold = max(dynamic_threshold, self.floor_threshold)
 
         # --- 2. 定义搜索范围 ---
-        margin_frames = int((search_margin_ms / 1000) * self.sample_rate)
-        if len(data) < margin_frames:
-            margin_frames = len(data)
-        
-        search_area = data[-margin_frames:]
-        if len(search_area) == 0:
+        margin_frames = min(self._margin_frames, len(data))
+
+        # --- 3. 搜索范围内的小步长（如20ms）窗口就是包络末尾的若干项，从后向前查找低于阈值的窗口 ---
+        # 与逐步向前扫描一致：窗口起点为 len - k*step (k >= 1)，且起点必须大于 0
+        num_windows = (margin_frames - 1) // self._step_frames
+        if num_windows == 0:
             return None
+        window_rms = np.sqrt(window_sumsq[-num_windows:] / self._step_samples)
+        below = np.flatnonzero(window_rms < effective_threshold)
+        last_window = int(below[-1]) if below.size else -1
 
-        # --- 3. 在该范围内，从后向前遍历，以小步长（如20ms）检查音量 ---
-        step_ms = 20
-        step_frames = int((step_ms / 1000) * self.sample_rate)
-        if step_frames == 0: step_frames = 1
-        
-        min_rms_in_margin = float('inf')
-
-        for i in range(len(search_area) - step_frames, 0, -step_frames):
-            chunk_to_check = search_area[i : i + step_frames]
-            try:
-                rms = audioop.rms(chunk_to_check.tobytes(), 2)
-                min_rms_in_margin = min(min_rms_in_margin, rms)
-
-                if rms < effective_threshold:
-                    # 4. 如果音量低于生效阈值，则返回该位置作为切分点
-                    split_point_in_data = len(data) - margin_frames + i
-                    self.logger.info(
-                        f"Found split point at frame {split_point_in_data} with RMS: {rms:.2f} "
-                        f"(effective threshold: {effective_threshold:.2f})"
-                    )
-                    return split_point_in_data
-            except Exception:
-                pass # 忽略单个小块的计算错误
+        if last_window >= 0:
+            # 4. 最靠后的一个低于生效阈值的窗口即为切分点
+            split_point_in_data = len(data) - (num_windows - last_window) * self._step_frames
+            self._log(
+                logging.INFO,
+                "Found split point at frame %d with RMS: %.2f (effective threshold: %.2f)",
+                split_point_in_data, float(window_rms[last_window]), effective_threshold
+            )
+            return split_point_in_data
 
         # 5. 如果搜索完仍未找到，返回 None并提供更有用的日志
-        self.logger.info(
-            f"No suitable split point found. "
-            f"Min RMS in margin was {min_rms_in_margin:.2f}, "
-            f"not below effective threshold of {effective_threshold:.2f} "
-            f"(avg_rms: {avg_rms:.2f}, ratio: {self.split_ratio}, floor: {self.floor_threshold})."
+        self._log(
+            logging.INFO,
+            "No suitable split point found. Min RMS in margin was %.2f, "
+            "not below effective threshold of %.2f (avg_rms: %.2f, ratio: %s, floor: %s).",
+            float(window_rms.min()), effective_threshold, avg_rms, self.split_ratio, self.floor_threshold
         )
         return None
 
@@ -210,41 +385,50 @@ class RecordingService:
             if self.recording_thread.is_alive():
                 self.logger.error("Recording thread did not terminate in time.")
 
+        # 音频流关闭后再停止处理线程，确保所有已写入的完整周期都按正常流程切分
+        self._processing_stop.set()
+        self._data_ready.set()
+        if self.processing_thread:
+            # 不设超时：处理线程退出前只会处理剩余的完整周期（流已关闭，工作量有限，
+            # 首次调用时的 numba 编译也可能在其中）。必须等它结束，下面的收尾代码才能独占缓冲区状态
+            self.processing_thread.join()
+
         self.is_recording = False
 
         # --- 处理所有剩余的音频 ---
-        final_chunk_parts = []
-        # 1. 从结转缓冲区开始
-        if self._carry_over_buffer is not None and self._carry_over_buffer.size > 0:
-            final_chunk_parts.append(self._carry_over_buffer)
-        
-        # 2. 添加主缓冲区的内容
-        if self._buffer:
-            main_buffer_data = np.concatenate(self._buffer)
-            if main_buffer_data.size > 0:
-                final_chunk_parts.append(main_buffer_data)
+        # 1. 将主缓冲区中尚未处理的内容接到结转音频之后
+        remaining_frames = self.get_buffer_len_in_frames()
+        if remaining_frames > 0:
+            self._pending_reserve(self._pending_len + remaining_frames)
+            tail = self._pending[self._pending_len:self._pending_len + remaining_frames]
+            self._ring_read(remaining_frames, out=tail)
+            self._pending_len += remaining_frames
+            self._pending_sumsq += _sumsq_i16(tail)
 
-        # 3. 发送最后的音频块
-        if final_chunk_parts:
-            final_chunk = np.concatenate(final_chunk_parts)
-            self.send_chunk(final_chunk)
+        # 2. 发送最后的音频块
+        if self._pending_len > 0:
+            self.send_chunk(self._pending[:self._pending_len].copy(), self._pending_sumsq)
 
         # 重置缓冲区
-        self._buffer = []
-        self._carry_over_buffer = None
+        self._write_idx = 0
+        self._read_idx = 0
+        self._pending_len = 0
+        self._pending_sumsq = 0
 
-        if not self._full_audio_data:
+        if self._full_len == 0:
             self.logger.warning("Recording stopped, but no audio data was captured.")
             return None
 
-        try:
-            # 合并完整的音频数据
-            full_audio = np.concatenate(self._full_audio_data)
-            self.logger.info(f"Recording stopped. Captured {len(full_audio)} samples in total.")
-            return full_audio
-        except ValueError:
-            self.logger.error("Failed to concatenate full audio data. It might be empty.")
-            return None
+        if self._full_dropped_frames:
+            self.logger.warning(
+                f"Recording exceeded {self.max_recording_seconds}s, "
+                f"{self._full_dropped_frames} frames were not kept in the full recording."
+            )
+
+        # 直接返回预分配缓冲区的视图，无需再拼接
+        full_audio = self._full_audio[:self._full_len]
+        self.logger.info(f"Recording stopped. Captured {len(full_audio)} samples in total.")
+        return full_audio
 
     def save_to_file(self, filename: str, audio_data: np.ndarray) -> Optional[str]:
         """保存音频数据到WAV文件"""
@@ -258,22 +442,27 @@ class RecordingService:
             
             filepath = output_dir / Path(filename).name
             
-            # 检查音频数据是否为静音
-            max_abs_val = np.max(np.abs(audio_data))
+            # 检查音频数据是否为静音：用 max/min 两次归约求峰值，不分配 abs 临时数组；
+            # 转成 Python int 后取负，-32768 也不会在 int16 中溢出
+            max_abs_val = max(int(audio_data.max()), -int(audio_data.min()))
             if max_abs_val == 0:
                 self.logger.warning("Audio data is completely silent. Saving as is.")
-                # 创建一个符合格式的静音数组
-                normalized_audio = np.zeros_like(audio_data, dtype=np.int16)
+                # 缩放系数为 0，写出的就是符合格式的静音数据
+                scale = np.float32(0.0)
             else:
-                # 标准化并转换为16位PCM格式
-                normalized_audio = np.int16(audio_data / max_abs_val * 32767)
+                scale = np.float32(32767.0 / max_abs_val)
 
-            sf.write(
-                filepath,
-                normalized_audio,
-                samplerate=self.sample_rate,
-                subtype='PCM_16'
-            )
+            # 标准化并转换为16位PCM格式：按块乘法写入复用的 int16 缓冲区后流式写出，
+            # 不需要为整段录音分配一份标准化后的副本
+            channels = audio_data.shape[1] if audio_data.ndim > 1 else 1
+            block_frames = min(_SAVE_BLOCK_FRAMES, len(audio_data))
+            block = np.empty((block_frames,) + audio_data.shape[1:], dtype=np.int16)
+            with sf.SoundFile(filepath, 'w', samplerate=self.sample_rate, channels=channels, subtype='PCM_16') as out:
+                for start in range(0, len(audio_data), block_frames):
+                    src = audio_data[start:start + block_frames]
+                    dst = block[:len(src)]
+                    np.multiply(src, scale, out=dst, casting='unsafe')
+                    out.write(dst)
             self.logger.info(f"Audio saved to {filepath}")
             return str(filepath)
         except Exception as e:
@@ -1,10 +1,82 @@
-import sys
+import math
+import time
 import logging
 from typing import Optional
+from functools import lru_cache
+
+from PySide6.QtCore import Qt, QTimer, Signal, Slot, QPoint, QRect, QSize
+from PySide6.QtWidgets import QApplication, QLabel, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QAbstractButton, QFrame, QTextBrowser
+from PySide6.QtGui import QMouseEvent, QPainter, QColor, QPen, QFont, QPixmap, QFontMetrics, QTextCursor
+
+# ControlWidget 的样式表模板，只有文字颜色随参数变化
+_CONTROL_WIDGET_QSS = """
+QWidget {{
+    background-color: rgba(0, 0, 0, 0.7);
+    color: {text_color};
+    border-radius: 15px;
+}}
+QPushButton {{
+    background-color: #555;
+    border: none;
+    padding: 8px;
+    border-radius: 8px;
+}}
+QPushButton:hover {{
+    background-color: #666;
+}}
+QLabel, QTextBrowser {{
+    padding-left: 5px;
+}}
+#timerLabel {{
+    background-color: rgba(20, 20, 20, 0.7);
+    border-radius: 10px;
+    padding: 5px;
+}}
+"""
+
+
+@lru_cache(maxsize=None)
+def _font(point_size: int, bold: bool = False) -> QFont:
+    """
+    按字号/粗细缓存基于应用默认字体的 QFont。
+    QFont 需要在 QApplication 创建之后构造，因此在首次使用时才生成，而不是在模块导入时。
+    """
+    font = QFont(QApplication.font())
+    font.setPointSize(point_size)
+    font.setBold(bold)
+    return font
+
+
+# 主屏幕可用区域的缓存，屏幕增删、主屏幕切换或其可用区域变化（如任务栏移动）时失效
+_primary_geometry: Optional[QRect] = None
+_screen_signals_connected = False
+_watched_screen = None # 已连接 availableGeometryChanged 的屏幕
+
+
+def _invalidate_primary_geometry(*_args) -> None:
+    global _primary_geometry
+    _primary_geometry = None
+
+
+def _primary_screen_geometry() -> Optional[QRect]:
+    """返回主屏幕的可用区域；首次调用时查询并缓存，没有主屏幕时返回 None"""
+    global _primary_geometry, _screen_signals_connected, _watched_screen
+    if _primary_geometry is None:
+        screen = QApplication.primaryScreen()
+        if screen is None:
+            return None
+        if not _screen_signals_connected:
+            app = QApplication.instance()
+            app.screenAdded.connect(_invalidate_primary_geometry)
+            app.screenRemoved.connect(_invalidate_primary_geometry)
+            app.primaryScreenChanged.connect(_invalidate_primary_geometry)
+            _screen_signals_connected = True
+        if screen is not _watched_screen:
+            screen.availableGeometryChanged.connect(_invalidate_primary_geometry)
+            _watched_screen = screen
+        _primary_geometry = screen.availableGeometry()
+    return _primary_geometry
 
-from PySide6.QtCore import Qt, QTimer, Signal, Property, QPoint, QRect, QSize
-from PySide6.QtWidgets import QApplication, QLabel, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QAbstractButton, QSizePolicy
-from PySide6.QtGui import QScreen, QMouseEvent, QPainter, QColor, QBrush, QPen
 
 class Switch(QAbstractButton):
     """A custom switch control widget."""
@@ -17,16 +89,36 @@ class Switch(QAbstractButton):
         self._track_color_on = QColor("#34C759")
         self.setFixedSize(51, 31)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
+        # 开/关两种状态预先绘制成 QPixmap，重绘时直接贴图；尺寸或设备像素比变化时重建
+        self._pixmaps: dict[bool, QPixmap] = {}
+        self._pixmap_key: Optional[tuple] = None
 
     def paintEvent(self, event):
-        painter = QPainter(self)
+        key = (self.width(), self.height(), self.devicePixelRatioF())
+        if key != self._pixmap_key:
+            self._pixmaps.clear()
+            self._pixmap_key = key
+        checked = self.isChecked()
+        pixmap = self._pixmaps.get(checked)
+        if pixmap is None:
+            pixmap = self._pixmaps[checked] = self._render_state(checked)
+        QPainter(self).drawPixmap(0, 0, pixmap)
+
+    def _render_state(self, checked: bool) -> QPixmap:
+        """按当前尺寸和设备像素比绘制一种状态的开关"""
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
 
         track_rect = self.rect().adjusted(1, 1, -1, -1)
         thumb_radius = (track_rect.height() / 2) - 1
         track_radius = track_rect.height() / 2
 
-        if self.isChecked():
+        if checked:
             painter.setBrush(self._track_color_on)
         else:
             painter.setBrush(self._track_color)
@@ -34,11 +126,13 @@ class Switch(QAbstractButton):
         painter.setPen(Qt.PenStyle.NoPen)
         painter.drawRoundedRect(track_rect, track_radius, track_radius)
 
-        thumb_x = thumb_radius + 2 if not self.isChecked() else self.width() - thumb_radius - 2
+        thumb_x = thumb_radius + 2 if not checked else self.width() - thumb_radius - 2
 
         painter.setPen(QPen(QColor(0, 0, 0, 50), 1))
         painter.setBrush(self._thumb_color)
         painter.drawEllipse(QPoint(thumb_x, self.height() // 2), thumb_radius, thumb_radius)
+        painter.end()
+        return pixmap
 
     def sizeHint(self):
         return QSize(51, 31)
@@ -54,13 +148,20 @@ class ControlWidget(QWidget):
     exit_requested = Signal()
     enhancement_toggled = Signal(bool)
     
-    # 新增信号用于更新转写文本
-    transcription_updated = Signal(str)
+    # 更新转写文本：(文本, 是否追加)。工作线程只能通过该信号更新，由 GUI 线程排队执行
+    transcription_updated = Signal(str, bool)
 
     def __init__(self, bg_color: str = 'black', text_color: str = 'white', font_size: int = 48):
         super().__init__()
         self.logger = logging.getLogger(__name__)
         self.remaining_seconds = 0
+        self._countdown_deadline = 0.0 # 倒计时结束的 time.monotonic() 时刻
+        self._transcription_text = "" # 当前显示的转写文本，追加时直接使用，不从控件读回
+        self._pending_append = "" # 尚未写入文档的追加内容
+        self._pending_replace = False # 下次刷新时是否需要整体替换文档内容
+        # 只在录音状态下接受追加：停止录音时 GUI 线程在等待工作线程结束，期间排队的追加信号
+        # 会在最终文本显示之后才送达，此时必须丢弃，否则最后几句会重复显示
+        self._accepting_appends = False
 
         self.setWindowFlags(
             Qt.WindowType.FramelessWindowHint |
@@ -68,52 +169,28 @@ class ControlWidget(QWidget):
             Qt.WindowType.Tool
         )
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setStyleSheet(f"""
-            QWidget {{
-                background-color: rgba(0, 0, 0, 0.7);
-                color: {text_color};
-                border-radius: 15px;
-            }}
-            QPushButton {{
-                background-color: #555;
-                border: none;
-                padding: 8px;
-                border-radius: 8px;
-            }}
-            QPushButton:hover {{
-                background-color: #666;
-            }}
-            QLabel {{
-                padding-left: 5px;
-            }}
-            #timerLabel {{
-                background-color: rgba(20, 20, 20, 0.7);
-                border-radius: 10px;
-                padding: 5px;
-            }}
-        """)
+        self.setStyleSheet(_CONTROL_WIDGET_QSS.format(text_color=text_color))
         
         self.label_timer = QLabel("Ready", self)
         self.label_timer.setObjectName("timerLabel")
         self.label_timer.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, True)
-        font = self.label_timer.font()
-        font.setPointSize(font_size)
-        font.setBold(True)
-        self.label_timer.setFont(font)
+        self.label_timer.setFont(_font(font_size, bold=True))
         self.label_timer.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.label_timer.setTextFormat(Qt.TextFormat.PlainText)
         
-        self.transcription_label = QLabel("", self)
-        font = self.transcription_label.font()
-        font.setPointSize(14)
-        self.transcription_label.setFont(font)
-        self.transcription_label.setWordWrap(True)
-        self.transcription_label.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
-        self.transcription_label.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Expanding)
+        # 转写文本用 QTextBrowser 显示：追加时只在文档末尾插入新增部分，不重新排版全部文本；
+        # 控件高度固定，文本超出时自行滚动，不再随文本增长调整窗口尺寸
+        self.transcription_label = QTextBrowser(self)
+        self.transcription_label.setFrameStyle(QFrame.Shape.NoFrame)
+        self.transcription_label.setFont(_font(14))
+        self.transcription_label.setFixedWidth(280 - 30) # 窗口最小宽度减去左右边距，文本增长时宽度不变
+        self.transcription_label.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.transcription_label.setFixedHeight(QFontMetrics(_font(14)).lineSpacing() * 5 + 10)
         self.transcription_label.hide()
         
-        self.start_button = QPushButton("Start Recording", self)
-        self.stop_button = QPushButton("Stop Recording", self)
-        self.exit_button = QPushButton("Exit", self)
+        self.start_button = self._make_button("Start Recording", self.start_requested)
+        self.stop_button = self._make_button("Stop Recording", self.stop_requested)
+        self.exit_button = self._make_button("Exit", self.exit_requested)
 
         main_layout = QVBoxLayout(self)
         main_layout.setSpacing(12)
@@ -137,88 +214,164 @@ class ControlWidget(QWidget):
         main_layout.addWidget(self.exit_button)
         self.setMinimumWidth(280)
 
+        # 倒计时使用单次定时器，每次只在显示的秒数即将变化时唤醒；CoarseTimer 允许系统合并唤醒
         self.countdown_timer = QTimer(self)
+        self.countdown_timer.setSingleShot(True)
+        self.countdown_timer.setTimerType(Qt.TimerType.CoarseTimer)
         self.countdown_timer.timeout.connect(self._update_countdown)
 
-        self.keep_on_top_timer = QTimer(self)
-        self.keep_on_top_timer.timeout.connect(self._ensure_on_top)
-        self.keep_on_top_timer.setInterval(500)
+        # 转写更新先记录下来，50ms 内的多次更新合并为一次 setText/布局
+        self._transcription_flush_timer = QTimer(self)
+        self._transcription_flush_timer.setSingleShot(True)
+        self._transcription_flush_timer.setInterval(50)
+        self._transcription_flush_timer.timeout.connect(self._flush_transcription)
+        self.transcription_updated.connect(self.update_transcription, Qt.ConnectionType.QueuedConnection)
+
+        # 与按钮相同，开关的信号也直接连接到对外信号
+        self.enhancement_switch.toggled.connect(self.enhancement_toggled)
 
-        self.start_button.clicked.connect(self.start_requested.emit)
-        self.stop_button.clicked.connect(self.stop_requested.emit)
-        self.exit_button.clicked.connect(self.exit_requested.emit)
-        self.enhancement_switch.toggled.connect(self.enhancement_toggled.emit)
+        # 置顶由窗口标志保证；只在显示时和应用失去前台时各提升一次，不主动抢占焦点
+        QApplication.instance().applicationStateChanged.connect(self._on_application_state_changed)
 
         self.set_idle_state()
         self.drag_pos: Optional[QMouseEvent] = None
         self._center_on_screen()
 
+    def _make_button(self, text: str, clicked_signal) -> QPushButton:
+        """创建按钮，并将其 clicked 信号直接连接到对外的信号（由 Qt 在 C++ 侧转发）"""
+        button = QPushButton(text, self)
+        button.clicked.connect(clicked_signal)
+        return button
+
+    @Slot(bool)
     def set_enhancement_state(self, enabled: bool):
         self.enhancement_switch.setChecked(enabled)
 
-    def _ensure_on_top(self):
-        """主动将窗口提升到顶层，确保其可见性。"""
-        if self.isVisible():
-            self.raise_()
-            self.activateWindow()
-
-
+    @Slot()
     def set_idle_state(self):
         self.logger.info("UI set to idle state.")
-        self.countdown_timer.stop()
-        self.keep_on_top_timer.stop()
-        self.label_timer.setText("Ready")
-        self.start_button.show()
-        self.stop_button.hide()
-        self.transcription_label.hide()
-        self.transcription_label.clear()
+        # 多个子控件同时显示/隐藏/改文本：暂停重绘，结束后统一重绘一次
+        self.setUpdatesEnabled(False)
+        try:
+            self.countdown_timer.stop()
+            self.label_timer.setText("Ready")
+            self.start_button.show()
+            self.stop_button.hide()
+            self.transcription_label.hide()
+            self._accepting_appends = False
+            self._reset_transcription()
+        finally:
+            self.setUpdatesEnabled(True)
 
+    @Slot()
     def _update_countdown(self):
-        self.remaining_seconds -= 1
-        self.label_timer.setText(str(self.remaining_seconds))
-        if self.remaining_seconds <= 0:
+        # 按单调时钟计算剩余秒数，事件循环被阻塞时也不会累积误差；数值不变时不重绘
+        remaining_time = self._countdown_deadline - time.monotonic()
+        remaining = max(0, math.ceil(remaining_time))
+        if remaining != self.remaining_seconds:
+            self.remaining_seconds = remaining
+            self.label_timer.setText(str(remaining))
+        if remaining <= 0:
+            self.countdown_timer.stop()
             self.stop_requested.emit()
+            return
+        # 定时到下一个整秒边界（稍微推后几毫秒，保证唤醒时显示值已经变化）
+        self.countdown_timer.start(int((remaining_time - (remaining - 1)) * 1000) + 5)
+
+    def _reset_transcription(self):
+        """清空转写文本及尚未刷新的更新"""
+        self._transcription_flush_timer.stop()
+        self._transcription_text = ""
+        self._pending_append = ""
+        self._pending_replace = False
+        self.transcription_label.clear()
 
+    @Slot(str, bool)
     def update_transcription(self, text: str, append: bool = False):
-        """更新转写文本内容"""
+        """更新转写文本内容（延迟到 _flush_transcription 中统一显示）"""
         if append:
-            current_text = self.transcription_label.text()
-            new_text = f"{current_text} {text}".strip()
-            self.transcription_label.setText(new_text)
+            if not self._accepting_appends:
+                self.logger.debug("Ignoring late transcription append outside of recording state.")
+                return
+            text = text.strip()
+            if not text:
+                return
+            delta = f" {text}" if self._transcription_text else text
+            self._transcription_text += delta
+            if not self._pending_replace:
+                self._pending_append += delta
         else:
-            self.transcription_label.setText(text)
+            self._transcription_text = text
+            self._pending_replace = True
+            self._pending_append = ""
+        if not self._transcription_flush_timer.isActive():
+            self._transcription_flush_timer.start()
+
+    @Slot()
+    def _flush_transcription(self):
+        """把尚未显示的转写更新写入文档：追加时只插入新增文本，覆盖时才整体替换"""
+        self._transcription_flush_timer.stop()
+        if self._pending_replace:
+            self.transcription_label.setPlainText(self._transcription_text)
+        elif self._pending_append:
+            cursor = self.transcription_label.textCursor()
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(self._pending_append)
+            self.transcription_label.setTextCursor(cursor)
+        self._pending_append = ""
+        self._pending_replace = False
         
-        if text and not self.transcription_label.isVisible():
+        if self._transcription_text and not self.transcription_label.isVisible():
             self.transcription_label.show()
-        
-        self.adjustSize()
+        self.transcription_label.ensureCursorVisible()
     
+    @Slot(int)
     def set_recording_state(self, seconds: int):
-        self.logger.info(f"UI set to recording state for {seconds} seconds.")
-        self.remaining_seconds = seconds
-        self.label_timer.setText(str(self.remaining_seconds))
-        self.start_button.hide()
-        self.stop_button.show()
-        self.label_timer.show()
-        self.transcription_label.clear()
-        self.transcription_label.show()
-        self.countdown_timer.start(1000)
-        self.keep_on_top_timer.start()
-    
+        self.logger.info("UI set to recording state for %d seconds.", seconds)
+        self.setUpdatesEnabled(False)
+        try:
+            self.remaining_seconds = seconds
+            self._countdown_deadline = time.monotonic() + seconds
+            self.label_timer.setText(str(self.remaining_seconds))
+            self.start_button.hide()
+            self.stop_button.show()
+            self.label_timer.show()
+            self._reset_transcription()
+            self._accepting_appends = True
+            self.transcription_label.show()
+            self._update_countdown()
+        finally:
+            self.setUpdatesEnabled(True)
+
+    @Slot(str)
     def set_finished_state(self, final_text: str):
         """设置录音完成状态，显示最终转写文本"""
         self.logger.info("UI set to finished state.")
-        self.countdown_timer.stop()
-        self.keep_on_top_timer.stop()
-        self.start_button.show()
-        self.stop_button.hide()
-        self.update_transcription(final_text, append=False)
-    
+        self.setUpdatesEnabled(False)
+        try:
+            self.countdown_timer.stop()
+            self.start_button.show()
+            self.stop_button.hide()
+            self._accepting_appends = False
+            self.update_transcription(final_text, append=False)
+            self._flush_transcription()
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.raise_()
+
+    @Slot(Qt.ApplicationState)
+    def _on_application_state_changed(self, state: Qt.ApplicationState):
+        """其他应用切到前台时把窗口重新提升到顶层（不调用 activateWindow，避免抢走焦点）"""
+        if state != Qt.ApplicationState.ApplicationActive and self.isVisible():
+            self.raise_()
+
     def _center_on_screen(self):
         try:
-            primary_screen = QApplication.primaryScreen()
-            if primary_screen:
-                screen_geometry = primary_screen.availableGeometry()
+            screen_geometry = _primary_screen_geometry()
+            if screen_geometry:
                 self.move(screen_geometry.width() - self.width() - 20, 20)
         except Exception as e:
             self.logger.error(f"Could not center window on screen: {e}")
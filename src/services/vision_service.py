@@ -1,11 +1,11 @@
 import os
 import io
-import base64
 import json
 import logging
 from PIL import Image
-from google import genai
-from google.genai import types
+
+from utils.client_factory import get_genai_client
+from utils.screenshot_util import resize_image
 
 class VisionService:
     def __init__(self, config: dict):
@@ -19,13 +19,21 @@ class VisionService:
         if not api_key:
             raise ValueError(f"API key not found for provider {config.get('provider')}")
         
-        # 目前只支持 Google GenAI
+        # 目前只支持 Google GenAI；SDK 导入开销较大，创建服务时才导入
         if config.get('provider') == 'google':
-            self.client = genai.Client(api_key=api_key)
+            from google.genai import types
+            self._types = types
+            self.client = get_genai_client(api_key)
+            self._gen_config = types.GenerateContentConfig(
+                thinking_config=types.ThinkingConfig(thinking_budget=0),
+                response_mime_type="application/json",
+            )
         else:
             raise NotImplementedError(f"Provider '{config.get('provider')}' is not supported in VisionService.")
             
         self.model = config['model']
+        self.max_width = config.get('max_width', 1200)
+        self.jpeg_quality = config.get('jpeg_quality', 85)
         self.logger = logging.getLogger(__name__)
 
     def analyze_screenshot(self, image: Image.Image) -> dict:
@@ -55,36 +63,40 @@ JSON 输出必须包含以下键：
         try:
             self.logger.info("Sending screenshot to Vision API for analysis...")
             
-            # 转换为base64编码
+            # 上传前先缩放到 max_width（调用方已缩放时不做任何处理），
+            # 再编码为 JPEG：视觉模型不需要无损输入，JPEG 编码比 PNG 快得多、体积也小得多。
+            # 直接上传编码后的字节（SDK 接收原始字节，无需 base64 编解码）
+            image = resize_image(image, self.max_width)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
             buffered = io.BytesIO()
-            image.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
+            image.save(buffered, format="JPEG", quality=self.jpeg_quality)
+            image_bytes = buffered.getvalue()
             
+            types = self._types
             contents = [
-                genai.types.Content(
+                types.Content(
                     role="user",
                     parts=[
-                        genai.types.Part.from_bytes(
-                            mime_type="image/png",
-                            data=base64.b64decode(img_base64),
+                        types.Part.from_bytes(
+                            mime_type="image/jpeg",
+                            data=image_bytes,
                         ),
                         types.Part.from_text(text=prompt),
                     ],
                 )
             ]
             
-            generate_content_config = types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0),
-                response_mime_type="application/json",
-            )
-            
-            response = ""
+            # 流式分块先收集到列表，结束后一次拼接；没有文本的分块（text 为 None）直接跳过
+            parts = []
             for chunk in self.client.models.generate_content_stream(
                 model=self.model,
                 contents=contents,
-                config=generate_content_config,
+                config=self._gen_config,
             ):
-                response += chunk.text
+                if chunk.text:
+                    parts.append(chunk.text)
+            response = "".join(parts)
             
             self.logger.info(f"Vision API response received: {response}")
             return json.loads(response)
@@ -0,0 +1,63 @@
+import threading
+from collections import deque
+from queue import Empty
+from typing import Any, Optional
+
+
+class ChunkQueue:
+    """
+    音频块队列：录音处理线程写入，转录线程读取。
+
+    基于 collections.deque 实现，append/popleft 本身是原子操作，写入时不需要获取互斥锁。
+    threading.Event 只用于唤醒等待中的读取方，并且只在其尚未被设置时才调用 set()，
+    因此连续写入时不会反复进入 Event 内部的锁。
+
+    指定 maxsize 时队列有界：写入方永不阻塞，队列已满时丢弃最旧的元素。
+    结束写入请调用 close()，而不是放入 None：放入结束标记可能挤掉一个尚未读取的元素。
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self._items: deque = deque(maxlen=maxsize or None)
+        self._not_empty = threading.Event()
+        self._closed = False
+
+    def put(self, item: Any) -> bool:
+        """放入一个元素（不阻塞）；队列已满、最旧的元素被丢弃时返回 False"""
+        full = self._items.maxlen is not None and len(self._items) >= self._items.maxlen
+        self._items.append(item)
+        if not self._not_empty.is_set():
+            self._not_empty.set()
+        return not full
+
+    def close(self) -> None:
+        """结束写入：剩余元素全部取出后，get() 返回 None；不会为此丢弃任何元素"""
+        self._closed = True
+        self._not_empty.set()
+
+    def reset(self) -> None:
+        """清空队列并重新开放写入（用于下一次录音）"""
+        self._items.clear()
+        self._closed = False
+        self._not_empty.clear()
+
+    def get(self) -> Any:
+        """取出一个元素，队列为空时阻塞等待；队列已关闭且为空时返回 None"""
+        while True:
+            try:
+                return self._items.popleft()
+            except IndexError:
+                if self._closed:
+                    return None
+                self._not_empty.wait()
+                # 先清除再重新尝试取出，避免错过在两者之间写入的元素
+                self._not_empty.clear()
+
+    def get_nowait(self) -> Any:
+        """取出一个元素，队列为空时抛出 queue.Empty"""
+        try:
+            return self._items.popleft()
+        except IndexError:
+            raise Empty from None
+
+    def empty(self) -> bool:
+        return not self._items
@@ -0,0 +1,43 @@
+from functools import lru_cache
+from typing import Optional
+
+from groq import Groq, DefaultHttpxClient, APIConnectionError, InternalServerError, RateLimitError
+
+# 请求关闭了 SDK 自带重试（max_retries=0，超时由 LatencyTracker 处理）后，
+# 仍需退避重试的暂时性错误：限流（429）、连接失败、服务端错误（5xx）
+GROQ_TRANSIENT_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+def get_groq_client(api_key: str, proxy_config: Optional[dict] = None) -> Groq:
+    """
+    获取共享的 Groq 客户端。
+
+    使用相同 API 密钥和代理配置的服务（ASR、文本修正、内容增强）共用同一个客户端，
+    从而共用底层 httpx 连接池和 TLS 会话，连续请求时无需重复握手。
+
+    Args:
+        api_key (str): Groq API 密钥。
+        proxy_config (dict | None): 代理配置，如 {"http": ..., "https": ...}。
+    """
+    return _build_groq_client(api_key, frozenset((proxy_config or {}).items()))
+
+
+@lru_cache(maxsize=4)
+def _build_groq_client(api_key: str, proxy_items: frozenset) -> Groq:
+    """按 (api_key, 代理配置) 缓存客户端实例"""
+    proxies = dict(proxy_items)
+    proxy = proxies.get('https') or proxies.get('http')
+    if proxy:
+        return Groq(api_key=api_key, http_client=DefaultHttpxClient(proxy=proxy))
+    return Groq(api_key=api_key)
+
+
+@lru_cache(maxsize=4)
+def get_genai_client(api_key: str):
+    """
+    获取共享的 Google GenAI 客户端（按 API 密钥缓存）。
+
+    视觉分析和内容增强使用同一密钥时共用一个客户端；google-genai 导入开销较大，首次调用时才导入。
+    """
+    from google import genai
+    return genai.Client(api_key=api_key)
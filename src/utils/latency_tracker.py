@@ -0,0 +1,100 @@
+import time
+import logging
+import threading
+from typing import Callable, Optional, Tuple, Type, TypeVar
+
+T = TypeVar('T')
+
+
+class LatencyTracker:
+    """
+    跟踪 LLM 请求耗时的指数滑动平均（EWMA），并据此给出单次请求的超时时间。
+
+    启动时测得的网络往返时间（RTT）会从每次请求耗时中扣除，
+    EWMA 记录的是扣除 RTT 后的服务端耗时，日志统计也因此不受网络抖动影响。
+    """
+
+    def __init__(self, name: str, alpha: float = 0.2, multiplier: float = 2.5,
+                 min_timeout: float = 5.0, initial_timeout: float = 30.0):
+        self.name = name
+        self.alpha = alpha
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.initial_timeout = initial_timeout
+        self.rtt = 0.0
+        self._lat_ewma: Optional[float] = None
+        self.logger = logging.getLogger(__name__)
+
+    def measure_rtt(self, ping: Callable[[], object]) -> None:
+        """执行一次轻量请求测量网络往返时间，失败时 RTT 保持为 0"""
+        start = time.monotonic()
+        try:
+            ping()
+        except Exception as e:
+            self.logger.warning(f"[{self.name}] RTT probe failed, timeouts will not be ping-adjusted: {e}")
+            return
+        self.rtt = time.monotonic() - start
+        self.logger.info(f"[{self.name}] Provider RTT: {self.rtt * 1000:.0f} ms")
+
+    def measure_rtt_in_background(self, ping: Callable[[], object]) -> None:
+        """在后台线程中测量 RTT，不阻塞调用方；测得之前按 RTT 为 0 计算超时"""
+        threading.Thread(
+            target=self.measure_rtt, args=(ping,), daemon=True, name=f'{self.name}-rtt'
+        ).start()
+
+    @property
+    def timeout(self) -> float:
+        """当前建议的请求超时时间（秒）"""
+        if self._lat_ewma is None:
+            return self.initial_timeout
+        return max(self.min_timeout, (self._lat_ewma + self.rtt) * self.multiplier)
+
+    def record(self, latency: float) -> None:
+        """记录一次成功请求的耗时（秒）"""
+        server_time = max(0.0, latency - self.rtt)
+        if self._lat_ewma is None:
+            self._lat_ewma = server_time
+        else:
+            self._lat_ewma = self.alpha * server_time + (1 - self.alpha) * self._lat_ewma
+        self.logger.info(
+            f"[{self.name}] Latency {latency * 1000:.0f} ms "
+            f"(server ~{server_time * 1000:.0f} ms after RTT), "
+            f"EWMA {self._lat_ewma * 1000:.0f} ms, next timeout {self.timeout:.1f}s"
+        )
+
+    def call(self, request: Callable[[float], T], retry_on: Tuple[Type[BaseException], ...] = (TimeoutError,),
+             transient_on: Tuple[Type[BaseException], ...] = (), max_transient_retries: int = 2) -> T:
+        """
+        以当前超时时间执行请求，超时后将超时时间加倍并重试一次；
+        限流、连接失败等暂时性错误按指数退避（0.5s、1s ...）重试，超时时间不变。
+
+        Args:
+            request: 接收超时时间（秒）并执行请求的函数。
+            retry_on: 视为超时、需要重试的异常类型（优先于 transient_on 匹配）。
+            transient_on: 视为暂时性错误、退避后重试的异常类型。
+            max_transient_retries: 暂时性错误的最大重试次数。
+        """
+        timeout = self.timeout
+        timed_out = False
+        transient_retries = 0
+        while True:
+            start = time.monotonic()
+            try:
+                result = request(timeout)
+            except retry_on:
+                if timed_out:
+                    raise
+                timed_out = True
+                self.logger.warning(f"[{self.name}] Request timed out after {timeout:.1f}s, retrying once.")
+                timeout *= 2
+                continue
+            except transient_on as e:
+                if transient_retries >= max_transient_retries:
+                    raise
+                delay = 0.5 * 2 ** transient_retries
+                transient_retries += 1
+                self.logger.warning(f"[{self.name}] Transient error ({e}), retrying in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+            self.record(time.monotonic() - start)
+            return result
@@ -1,13 +1,39 @@
-import mss
-import mss.tools
-import pyautogui
 from PIL import Image
 import os
+import threading
 from datetime import datetime
 
 # 定义存放截图的目录
 RECORDING_DIR = "recordings"
 
+# mss 实例持有与显示服务器的连接，且不能跨线程使用；每个线程创建一次后复用。
+# 显示器布局随实例一起缓存，refresh_monitors() 之后各线程在下次截图时重新创建实例
+_thread_local = threading.local()
+_monitor_generation = 0
+
+
+def refresh_monitors(*_args) -> None:
+    """显示器增删或布局变化后调用，使缓存的显示器布局失效"""
+    global _monitor_generation
+    _monitor_generation += 1
+
+
+def _get_mss():
+    """获取当前线程复用的 mss 实例，并在需要时重新计算显示器边界"""
+    sct = getattr(_thread_local, "sct", None)
+    if sct is None or _thread_local.generation != _monitor_generation:
+        if sct is not None:
+            sct.close()
+        import mss # 只在首次截图时导入
+        sct = _thread_local.sct = mss.mss()
+        _thread_local.generation = _monitor_generation
+        # 预先计算每个显示器的 (left, top, right, bottom)，sct.monitors[0] 是所有显示器的合集
+        _thread_local.bboxes = [
+            (m["left"], m["top"], m["left"] + m["width"], m["top"] + m["height"], m)
+            for m in sct.monitors[1:]
+        ]
+    return sct
+
 
 def save_screenshot(image: Image.Image) -> str:
     """
@@ -20,16 +46,15 @@ def save_screenshot(image: Image.Image) -> str:
         str: 保存的文件路径。
     """
     # 确保目录存在
-    if not os.path.exists(RECORDING_DIR):
-        os.makedirs(RECORDING_DIR)
+    os.makedirs(RECORDING_DIR, exist_ok=True)
 
     # 生成文件名
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     filename = f"screenshot_{timestamp}.png"
     filepath = os.path.join(RECORDING_DIR, filename)
 
-    # 保存文件
-    image.save(filepath, "PNG")
+    # 保存文件：截图只作存档，使用最低压缩级别换取更快的编码
+    image.save(filepath, "PNG", compress_level=1)
     print(f"截图已保存至: {filepath}")
     return filepath
 
@@ -42,33 +67,33 @@ def take_screenshot() -> Image.Image:
     Returns:
         PIL.Image.Image: 捕获到的屏幕截图图像对象。
     """
-    with mss.mss() as sct:
-        try:
-            # 获取当前鼠标位置
-            mouse_x, mouse_y = pyautogui.position()
-            
-            # 遍历所有显示器，找到包含鼠标的那个
-            target_monitor = None
-            for monitor in sct.monitors[1:]: # sct.monitors[0] 是所有显示器的合集
-                if monitor["left"] <= mouse_x < monitor["left"] + monitor["width"] and \
-                   monitor["top"] <= mouse_y < monitor["top"] + monitor["height"]:
-                    target_monitor = monitor
-                    break
-            
-            # 如果没找到（例如鼠标在显示器之间），则默认使用主显示器
-            if not target_monitor:
-                target_monitor = sct.monitors[1]
-
-        except Exception:
-            # 如果pyautogui失败，也回退到主显示器
+    sct = _get_mss()
+    try:
+        # 获取当前鼠标位置（pyautogui 导入较慢，只在截图时导入；导入失败同样回退到主显示器）
+        import pyautogui
+        mouse_x, mouse_y = pyautogui.position()
+        
+        # 在缓存的显示器边界中找到包含鼠标的那个
+        target_monitor = None
+        for left, top, right, bottom, monitor in _thread_local.bboxes:
+            if left <= mouse_x < right and top <= mouse_y < bottom:
+                target_monitor = monitor
+                break
+        
+        # 如果没找到（例如鼠标在显示器之间），则默认使用主显示器
+        if not target_monitor:
             target_monitor = sct.monitors[1]
 
-        # 捕获目标显示器
-        sct_img = sct.grab(target_monitor)
-        
-        # 将mss的BGRA格式转换为PIL的RGB格式
-        img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
-        return img
+    except Exception:
+        # 如果pyautogui失败，也回退到主显示器
+        target_monitor = sct.monitors[1]
+
+    # 捕获目标显示器
+    sct_img = sct.grab(target_monitor)
+    
+    # 将mss的BGRA格式转换为PIL的RGB格式（由 PIL 的 C 解码器一次完成通道转换）
+    img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+    return img
 
 def resize_image(image: Image.Image, max_width: int) -> Image.Image:
     """
@@ -89,4 +114,6 @@ def resize_image(image: Image.Image, max_width: int) -> Image.Image:
     new_width = max_width
     new_height = int(new_width * aspect_ratio)
     
-    return image.resize((new_width, new_height), Image.LANCZOS)
\ No newline at end of file
+    # 截图只用于视觉分析，不需要 LANCZOS 的画质：先按整数倍做盒式缩小（reducing_gap），
+    # 再用 BILINEAR 完成剩余缩放，大幅缩小时速度快数倍
+    return image.resize((new_width, new_height), Image.Resampling.BILINEAR, reducing_gap=3.0)
\ No newline at end of file